@@ -0,0 +1,97 @@
+# cython: language_level=3
+"""
+Native TCP connect probe for the threaded scan engine.
+
+The whole socket/connect/poll/close sequence runs in C with the GIL
+released, so worker threads probe in parallel instead of queuing on the
+interpreter between system calls. POSIX only.
+
+Build in place with:  cythonize -i _scan.pyx
+"""
+
+from libc.errno cimport errno, EINTR, EINVAL, EINPROGRESS, EAGAIN
+from libc.string cimport memset
+from posix.unistd cimport close
+
+cdef extern from "<sys/socket.h>" nogil:
+    ctypedef unsigned int socklen_t
+    struct sockaddr:
+        pass
+    int socket(int domain, int type, int protocol)
+    int connect(int fd, const sockaddr *addr, socklen_t addrlen)
+    int getsockopt(int fd, int level, int optname, void *optval, socklen_t *optlen)
+    int AF_INET, SOCK_STREAM, SOL_SOCKET, SO_ERROR
+
+cdef extern from "<netinet/in.h>" nogil:
+    struct in_addr:
+        pass
+    struct sockaddr_in:
+        int sin_family
+        unsigned short sin_port
+        in_addr sin_addr
+    unsigned short htons(unsigned short value)
+
+cdef extern from "<arpa/inet.h>" nogil:
+    int inet_pton(int af, const char *src, void *dst)
+
+cdef extern from "<fcntl.h>" nogil:
+    int fcntl(int fd, int cmd, ...)
+    int F_GETFL, F_SETFL, O_NONBLOCK
+
+cdef extern from "<poll.h>" nogil:
+    struct pollfd:
+        int fd
+        short events
+        short revents
+    int poll(pollfd *fds, unsigned long nfds, int timeout)
+    short POLLOUT
+
+cdef int _tcp_probe(const char *ip, int port, int timeout_ms) noexcept nogil:
+    cdef sockaddr_in addr
+    cdef pollfd pfd
+    cdef int fd, ready
+    cdef int err = 0
+    cdef socklen_t errlen = sizeof(err)
+
+    memset(&addr, 0, sizeof(addr))
+    addr.sin_family = AF_INET
+    addr.sin_port = htons(<unsigned short>port)
+    if inet_pton(AF_INET, ip, &addr.sin_addr) != 1:
+        return EINVAL
+
+    fd = socket(AF_INET, SOCK_STREAM, 0)
+    if fd < 0:
+        return errno
+    fcntl(fd, F_SETFL, fcntl(fd, F_GETFL, 0) | O_NONBLOCK)
+
+    if connect(fd, <sockaddr *>&addr, sizeof(addr)) != 0:
+        if errno != EINPROGRESS:
+            err = errno
+        else:
+            pfd.fd = fd
+            pfd.events = POLLOUT
+            pfd.revents = 0
+            ready = poll(&pfd, 1, timeout_ms)
+            while ready < 0 and errno == EINTR:
+                ready = poll(&pfd, 1, timeout_ms)
+            if ready == 0:
+                err = EAGAIN
+            elif ready < 0:
+                err = errno
+            elif getsockopt(fd, SOL_SOCKET, SO_ERROR, &err, &errlen) != 0:
+                err = errno
+
+    close(fd)
+    return err
+
+def tcp_probe(str ip, int port, double timeout):
+    """Connect to ip:port; return 0 if open, otherwise the errno (EAGAIN on timeout)"""
+    cdef bytes ip_bytes = ip.encode("ascii")
+    cdef const char *c_ip = ip_bytes
+    cdef int timeout_ms = <int>(timeout * 1000)
+    cdef int result
+    if not 0 <= port <= 65535:
+        raise OverflowError("tcp_probe(): port must be 0-65535.")
+    with nogil:
+        result = _tcp_probe(c_ip, port, timeout_ms)
+    return result
@@ -9,92 +9,339 @@ Date: May 2025
 """
 
 import socket
+import asyncio
 import threading
+import collections
+import selectors
+import heapq
+import itertools
+import errno
+import os
+import random
+import select
+import struct
+import ctypes
 import argparse
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import subprocess
 import json
+import io
+import tempfile
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# connect_ex() results meaning "handshake still in progress" on a non-blocking socket
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN,
+                    getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)}
+
+# Common ports, their services and roughly how often each is found open
+# (nmap-services frequencies), most likely first
+COMMON_PORTS = (
+    (80, "HTTP", 0.484), (23, "Telnet", 0.221), (443, "HTTPS", 0.209),
+    (21, "FTP", 0.198), (22, "SSH", 0.182), (25, "SMTP", 0.131),
+    (3389, "RDP", 0.084), (110, "POP3", 0.077), (143, "IMAP", 0.051),
+    (53, "DNS", 0.048), (3306, "MySQL", 0.045), (995, "POP3S", 0.030),
+    (993, "IMAPS", 0.027), (5900, "VNC", 0.018), (1433, "MSSQL", 0.007),
+    (5432, "PostgreSQL", 0.002), (6379, "Redis", 0.001), (27017, "MongoDB", 0.001),
+)
+
+# Probe errors meaning no port on the target can be reached
+_UNREACHABLE = {errno.EHOSTUNREACH, errno.ENETUNREACH}
+
+# Unreachable results, with no reply from the target yet, before a scan is abandoned
+_UNREACHABLE_ABORT = 64
+
+# Back-off before retrying a probe that ran out of file descriptors
+_EMFILE_BACKOFF = 0.1
+
+# TCP header flag bits
+_TCP_SYN = 0x02
+_TCP_ACK = 0x10
+
+def fd_limit(default=512):
+    """Return the soft limit on open file descriptors for this process"""
+    if resource is None:
+        return default
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return default if soft == resource.RLIM_INFINITY else soft
+
+def raise_fd_limit():
+    """Raise the soft file descriptor limit to the hard limit where permitted"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+def _libc_tcp_probe():
+    """Build a tcp_probe() on libc via ctypes, or None where unsupported"""
+    # sockaddr_in layout and SOCK_NONBLOCK below are Linux-specific
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    
+    class SockaddrIn(ctypes.Structure):
+        _fields_ = [("sin_family", ctypes.c_ushort), ("sin_port", ctypes.c_uint16),
+                    ("sin_addr", ctypes.c_uint32), ("sin_zero", ctypes.c_ubyte * 8)]
+    
+    class PollFd(ctypes.Structure):
+        _fields_ = [("fd", ctypes.c_int), ("events", ctypes.c_short), ("revents", ctypes.c_short)]
+    
+    # ctypes drops the GIL for the duration of each of these calls
+    c_socket, c_connect, c_poll = libc.socket, libc.connect, libc.poll
+    c_getsockopt, c_close = libc.getsockopt, libc.close
+    c_socket.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    c_connect.argtypes = [ctypes.c_int, ctypes.POINTER(SockaddrIn), ctypes.c_uint]
+    c_poll.argtypes = [ctypes.POINTER(PollFd), ctypes.c_ulong, ctypes.c_int]
+    c_getsockopt.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                             ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_uint)]
+    c_close.argtypes = [ctypes.c_int]
+    
+    get_errno, byref, sizeof = ctypes.get_errno, ctypes.byref, ctypes.sizeof
+    unpack_addr = struct.Struct("=I").unpack  # keep network byte order in a native uint32
+    sock_type = socket.SOCK_STREAM | socket.SOCK_NONBLOCK
+    
+    def tcp_probe(ip, port, timeout):
+        """Connect to ip:port; return 0 if open, otherwise the errno (EAGAIN on timeout)"""
+        fd = c_socket(socket.AF_INET, sock_type, 0)
+        if fd < 0:
+            return get_errno()
+        try:
+            addr = SockaddrIn(socket.AF_INET, socket.htons(port), unpack_addr(socket.inet_aton(ip))[0])
+            if c_connect(fd, byref(addr), sizeof(addr)) == 0:
+                return 0
+            err = get_errno()
+            if err != errno.EINPROGRESS:
+                return err
+            
+            pfd = PollFd(fd, select.POLLOUT, 0)
+            ready = c_poll(byref(pfd), 1, int(timeout * 1000))
+            if ready == 0:
+                return errno.EAGAIN
+            if ready < 0:
+                return get_errno()
+            
+            so_error, length = ctypes.c_int(0), ctypes.c_uint(sizeof(ctypes.c_int))
+            if c_getsockopt(fd, socket.SOL_SOCKET, socket.SO_ERROR, byref(so_error), byref(length)) != 0:
+                return get_errno()
+            return so_error.value
+        finally:
+            c_close(fd)
+    
+    return tcp_probe
+
+try:
+    # Optional Cython probe (cythonize -i _scan.pyx) that runs without the GIL
+    from _scan import tcp_probe
+except ImportError:
+    tcp_probe = None
 
 class PortScanner:
-    def __init__(self, target, threads=100):
+    # Matches the port number of an open line in Nmap's normal output
+    _NMAP_OPEN_RE = re.compile(r'(\d+)/tcp\s+open')
+    
+    def __init__(self, target, threads=500, timeout=1, first_n=None):
         self.target = target
-        self.threads = threads
-        self.open_ports = []
-        self.lock = threading.Lock()
         
-        # Common ports and their services
-        self.common_ports = {
-            21: "FTP", 22: "SSH", 23: "Telnet", 25: "SMTP", 53: "DNS",
-            80: "HTTP", 110: "POP3", 143: "IMAP", 443: "HTTPS", 993: "IMAPS",
-            995: "POP3S", 1433: "MSSQL", 3306: "MySQL", 3389: "RDP", 5432: "PostgreSQL",
-            5900: "VNC", 6379: "Redis", 27017: "MongoDB"
-        }
+        # Every in-flight probe holds a descriptor, and past a few hundred per
+        # core extra concurrency only adds scheduling overhead
+        raise_fd_limit()
+        cap = min(int(fd_limit() * 0.8), (os.cpu_count() or 1) * 256)
+        if threads > cap:
+            print(f"[INFO] Limiting concurrency to {cap} (file descriptor and CPU limits)")
+        self.threads = max(1, min(threads, cap))
+        self.timeout = timeout
+        self.first_n = first_n
+        # set.add and deque.append are atomic, so engines can record hits
+        # without a lock; service names are looked up only when printing
+        self._open_set = set()
+        self._unprinted = collections.deque()
+        self._unreachable = False
+        self._answered = False
+        self._unreachable_count = 0
+        # Set once the scan should wind down: target unreachable or first_n hits
+        self._stop = threading.Event()
+        self._first_n_lock = threading.Lock()
+        
+        # Common ports and their services, iterated most likely first
+        self.common_ports = {port: service for port, service, _ in COMMON_PORTS}
     
     def resolve_target(self):
         """Resolve hostname to IP address"""
         try:
-            ip = socket.gethostbyname(self.target)
+            # Resolve once; every probe reuses this numeric address
+            addrinfo = socket.getaddrinfo(self.target, None, socket.AF_INET, socket.SOCK_STREAM)
+            ip = addrinfo[0][4][0]
             print(f"[INFO] Resolved {self.target} to {ip}")
             return ip
         except socket.gaierror:
             print(f"[ERROR] Could not resolve hostname: {self.target}")
             return None
     
-    def scan_port(self, ip, port):
-        """Scan a single port"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            result = sock.connect_ex((ip, port))
-            
-            if result == 0:
-                with self.lock:
-                    service = self.common_ports.get(port, "Unknown")
-                    self.open_ports.append((port, service))
-                    print(f"[OPEN] Port {port}: {service}")
+    async def scan_port_async(self, ip, port, sem, timeout):
+        """Scan a single port without blocking the event loop"""
+        async with sem:
+            while not self._stop.is_set():
+                try:
+                    _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port, family=socket.AF_INET), timeout)
+                    break
+                except asyncio.TimeoutError:
+                    return
+                except OSError as e:
+                    if e.errno == errno.EMFILE:
+                        await asyncio.sleep(_EMFILE_BACKOFF)
+                        continue
+                    self._check_result(port, e.errno)
+                    return
+            else:
+                return
             
-            sock.close()
-        except Exception as e:
-            pass
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        
+        # Single-threaded event loop, so no lock is needed here
+        self._record_open(port)
+    
+    def _check_result(self, port, result):
+        """Act on a connect_ex()-style errno for one probe"""
+        if result == 0:
+            self._answered = True
+            self._record_open(port)
+        elif result == errno.ECONNREFUSED:
+            self._answered = True
+        elif result in _UNREACHABLE:
+            # Firewall rejects (ICMP admin/host-prohibited) also show up as
+            # EHOSTUNREACH, so only give up on a target that has never answered
+            self._unreachable_count += 1
+            if not self._answered and self._unreachable_count >= _UNREACHABLE_ABORT:
+                self._unreachable = True
+                self._stop.set()
+        # Anything else (timeouts) means filtered
+    
+    def _record_open(self, port):
+        if self.first_n:
+            # Probes already in flight can still answer after the limit is hit
+            with self._first_n_lock:
+                if len(self._open_set) >= self.first_n:
+                    return
+                self._open_set.add(port)
+                if len(self._open_set) >= self.first_n:
+                    self._stop.set()
+        else:
+            self._open_set.add(port)
+        self._unprinted.append(port)
+    
+    def _flush_output(self):
+        """Write any open ports not yet printed in a single call"""
+        lines = []
+        service_for = self.common_ports.get
+        while self._unprinted:
+            port = self._unprinted.popleft()
+            lines.append(f"[OPEN] Port {port}: {service_for(port, 'Unknown')}\n")
+        if not lines:
+            return
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
+    
+    def _flush_loop(self, stop, interval=0.25):
+        while not stop.wait(interval):
+            self._flush_output()
+    
+    async def _scan_ports_async(self, ip, ports):
+        sem = asyncio.Semaphore(self.threads)
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(self.scan_port_async(ip, port, sem, self.timeout)) for port in ports]
+        cancelled = False
+        
+        def cancel_rest(_):
+            # Once the scan is told to stop, drop every probe still queued or in flight
+            nonlocal cancelled
+            if self._stop.is_set() and not cancelled:
+                cancelled = True
+                for task in tasks:
+                    task.cancel()
+        
+        for task in tasks:
+            task.add_done_callback(cancel_rest)
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                raise result
+    
+    def scan_ports(self, ip, ports):
+        """Scan the given ports, printing open ports in batches as they are found"""
+        if self._stop.is_set():
+            return
+        
+        stop = threading.Event()
+        flusher = threading.Thread(target=self._flush_loop, args=(stop,), daemon=True)
+        flusher.start()
+        try:
+            self._scan(ip, ports)
+        finally:
+            stop.set()
+            flusher.join()
+            self._flush_output()
+        
+        if self._unreachable:
+            print(f"[ERROR] {ip} is unreachable, scan aborted")
+        elif self._stop.is_set():
+            print(f"[INFO] Reached {self.first_n} open ports, stopping early")
+    
+    def _scan(self, ip, ports):
+        """Scan the given ports concurrently on a single event loop"""
+        asyncio.run(self._scan_ports_async(ip, ports))
     
     def scan_range(self, ip, start_port, end_port):
-        """Scan a range of ports using threading"""
+        """Scan a range of ports"""
         print(f"[INFO] Scanning {ip} from port {start_port} to {end_port}")
-        print(f"[INFO] Using {self.threads} threads")
+        print(f"[INFO] Using up to {self.threads} concurrent connections")
         print("-" * 50)
         
-        # Create thread pool
-        threads = []
+        self.scan_ports(ip, range(start_port, end_port + 1))
+    
+    def scan_range_adaptive(self, ip, start_port, end_port):
+        """Scan a range of ports, probing the likeliest ports first"""
+        print(f"[INFO] Adaptive scan of {ip} from port {start_port} to {end_port}")
+        print(f"[INFO] Using up to {self.threads} concurrent connections")
+        print("-" * 50)
         
-        for port in range(start_port, end_port + 1):
-            while len([t for t in threads if t.is_alive()]) >= self.threads:
-                time.sleep(0.01)
-            
-            thread = threading.Thread(target=self.scan_port, args=(ip, port))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
+        self.scan_ports(ip, self._adaptive_order(start_port, end_port))
+    
+    def _adaptive_order(self, start_port, end_port):
+        """Order a port range with the common ports in it first, then the rest"""
+        common = [port for port in self.common_ports if start_port <= port <= end_port]
+        skip = set(common)
+        return common + [port for port in range(start_port, end_port + 1) if port not in skip]
+    
+    def scan_specific_ports(self, ip, ports):
+        """Scan a list of individual ports"""
+        print(f"[INFO] Scanning specific ports: {ports}")
+        print("-" * 50)
         
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        self.scan_ports(ip, ports)
     
     def scan_common_ports(self, ip):
         """Quick scan of common ports"""
         print(f"[INFO] Quick scan of common ports on {ip}")
         print("-" * 50)
         
-        threads = []
-        for port in self.common_ports.keys():
-            thread = threading.Thread(target=self.scan_port, args=(ip, port))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
-        
-        for thread in threads:
-            thread.join()
+        self.scan_ports(ip, self.common_ports.keys())
     
     def nmap_comparison(self, ip, ports_to_check=None):
         """Compare results with Nmap"""
@@ -110,30 +357,56 @@ class PortScanner:
                 cmd = f"nmap -F {ip}"  # Fast scan
             
             print(f"[INFO] Running: {cmd}")
-            result = subprocess.run(cmd.split(), capture_output=True, text=True, timeout=60)
+            # stderr goes to a file so a chatty Nmap can't fill a pipe nobody is reading
+            stderr_file = tempfile.TemporaryFile(mode="w+")
+            try:
+                proc = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE, stderr=stderr_file,
+                                        text=True, bufsize=1)
+            except BaseException:
+                stderr_file.close()
+                raise
+            
+            # Reading stdout blocks until Nmap exits, so enforce the timeout by killing it
+            timed_out = threading.Event()
+            def kill():
+                timed_out.set()
+                proc.kill()
+            watchdog = threading.Timer(60, kill)
+            watchdog.start()
             
-            if result.returncode == 0:
+            # Parse Nmap results as they are printed
+            nmap_open_ports = set()
+            try:
                 print("\n[NMAP RESULTS]")
-                print(result.stdout)
-                
-                # Parse Nmap results
-                nmap_open_ports = []
-                for line in result.stdout.split('\n'):
-                    if '/tcp' in line and 'open' in line:
-                        port = int(line.split('/')[0])
-                        nmap_open_ports.append(port)
-                
+                for line in proc.stdout:
+                    print(line, end="")
+                    match = self._NMAP_OPEN_RE.match(line)
+                    if match:
+                        nmap_open_ports.add(int(match.group(1)))
+                returncode = proc.wait()
+                if returncode != 0:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read()
+            finally:
+                watchdog.cancel()
+                proc.stdout.close()
+                stderr_file.close()
+            
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, 60)
+            
+            if returncode == 0:
                 # Compare results
-                our_ports = [port for port, _ in self.open_ports]
+                our_ports = self._open_set
                 
                 print("\n[COMPARISON RESULTS]")
                 print("-" * 30)
                 print(f"Our scanner found: {sorted(our_ports)}")
                 print(f"Nmap found: {sorted(nmap_open_ports)}")
                 
-                matches = set(our_ports) & set(nmap_open_ports)
-                our_only = set(our_ports) - set(nmap_open_ports)
-                nmap_only = set(nmap_open_ports) - set(our_ports)
+                matches = our_ports & nmap_open_ports
+                our_only = our_ports - nmap_open_ports
+                nmap_only = nmap_open_ports - our_ports
                 
                 print(f"Matches: {sorted(matches)}")
                 if our_only:
@@ -141,11 +414,11 @@ class PortScanner:
                 if nmap_only:
                     print(f"Only Nmap found: {sorted(nmap_only)}")
                 
-                accuracy = len(matches) / len(set(our_ports) | set(nmap_open_ports)) * 100 if (our_ports or nmap_open_ports) else 0
+                accuracy = len(matches) / len(our_ports | nmap_open_ports) * 100 if (our_ports or nmap_open_ports) else 0
                 print(f"Accuracy: {accuracy:.1f}%")
                 
             else:
-                print(f"[ERROR] Nmap failed: {result.stderr}")
+                print(f"[ERROR] Nmap failed: {stderr}")
                 
         except subprocess.TimeoutExpired:
             print("[ERROR] Nmap scan timed out")
@@ -154,28 +427,266 @@ class PortScanner:
         except Exception as e:
             print(f"[ERROR] Nmap comparison failed: {e}")
     
-    def generate_report(self, scan_type, start_time, end_time):
+    def generate_report(self, scan_type, start_time, duration):
         """Generate a summary report"""
-        print("\n" + "="*50)
-        print("SCAN REPORT")
-        print("="*50)
+        # Build the whole report in memory and write it out in one call
+        out = io.StringIO()
+        print("\n" + "="*50, file=out)
+        print("SCAN REPORT", file=out)
+        print("="*50, file=out)
         
-        duration = end_time - start_time
+        end_time = start_time + timedelta(seconds=duration)
         
-        print(f"Target: {self.target}")
-        print(f"Scan Type: {scan_type}")
-        print(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Duration: {duration.total_seconds():.2f} seconds")
-        print(f"Open Ports Found: {len(self.open_ports)}")
+        print(f"Target: {self.target}", file=out)
+        print(f"Scan Type: {scan_type}", file=out)
+        print(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}", file=out)
+        print(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}", file=out)
+        print(f"Duration: {duration:.2f} seconds", file=out)
+        print(f"Open Ports Found: {len(self._open_set)}", file=out)
         
-        if self.open_ports:
-            print("\nOpen Ports:")
-            print("-" * 20)
-            for port, service in sorted(self.open_ports):
-                print(f"  {port:5d}/tcp  {service}")
+        if self._open_set:
+            print("\nOpen Ports:", file=out)
+            print("-" * 20, file=out)
+            for port in sorted(self._open_set):
+                service = self.common_ports.get(port, "Unknown")
+                print(f"  {port:5d}/tcp  {service}", file=out)
         else:
-            print("\nNo open ports found.")
+            print("\nNo open ports found.", file=out)
+        
+        sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
+
+class ThreadedScanner(PortScanner):
+    """Port scanner running blocking connects on a fixed pool of worker threads"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._emfile_backoff = threading.Event()
+        # Native connect probe; None means use the socket module
+        self.probe = tcp_probe
+    
+    def scan_port(self, ip, port, _socket=socket.socket, _af=socket.AF_INET, _stream=socket.SOCK_STREAM):
+        """Scan a single port"""
+        # Runs once per port, so keep lookups local
+        timeout, stopped, backoff, probe = self.timeout, self._stop.is_set, self._emfile_backoff, self.probe
+        addr = (ip, port)
+        while not stopped():
+            # Another worker ran out of descriptors; give the pool time to drain
+            if backoff.is_set():
+                time.sleep(_EMFILE_BACKOFF)
+                backoff.clear()
+            
+            if probe is not None:
+                result = probe(ip, port, timeout)
+            else:
+                try:
+                    with _socket(_af, _stream) as sock:
+                        sock.settimeout(timeout)
+                        result = sock.connect_ex(addr)
+                except OSError as e:
+                    result = e.errno
+            
+            if result == errno.EMFILE:
+                backoff.set()
+                continue
+            
+            self._check_result(port, result)
+            return
+    
+    def _scan(self, ip, ports):
+        """Scan the given ports on at most self.threads worker threads"""
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+        futures = []
+        try:
+            for port in ports:
+                futures.append(executor.submit(self.scan_port, ip, port))
+            for future in as_completed(futures):
+                future.result()  # surface worker errors like the other engines do
+                if self._stop.is_set():
+                    break
+        except BaseException:
+            # Ctrl-C or a failed probe: stop the workers instead of draining the queue
+            self._stop.set()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=not self._stop.is_set())
+
+class SelectorScanner(PortScanner):
+    """Port scanner driving non-blocking connects from a single selectors loop"""
+    
+    def _scan(self, ip, ports):
+        """Scan the given ports, multiplexing all in-flight connects on one selector"""
+        sel = selectors.DefaultSelector()
+        in_flight = {}  # fd -> (sock, port, deadline)
+        deadlines = []  # min-heap of (deadline, seq, fd, sock)
+        seq = itertools.count()
+        limit = self.threads
+        pending = iter(ports)
+        exhausted = False
+        new_socket, af_inet, sock_stream = socket.socket, socket.AF_INET, socket.SOCK_STREAM
+        
+        def finish(fd):
+            sock, port, _ = in_flight.pop(fd)
+            sel.unregister(fd)
+            sock.close()
+        
+        try:
+            while not self._stop.is_set():
+                # Top up the in-flight window
+                while not exhausted and len(in_flight) < limit:
+                    port = next(pending, None)
+                    if port is None:
+                        exhausted = True
+                        break
+                    
+                    try:
+                        sock = new_socket(af_inet, sock_stream)
+                    except OSError as e:
+                        if e.errno != errno.EMFILE:
+                            raise
+                        # Out of descriptors: retry this port once some are released
+                        pending = itertools.chain([port], pending)
+                        break
+                    
+                    sock.setblocking(False)
+                    result = sock.connect_ex((ip, port))
+                    if result not in _CONNECT_PENDING:
+                        sock.close()
+                        self._check_result(port, result)
+                        continue
+                    
+                    fd = sock.fileno()
+                    deadline = time.monotonic() + self.timeout
+                    in_flight[fd] = (sock, port, deadline)
+                    sel.register(fd, selectors.EVENT_WRITE, port)
+                    heapq.heappush(deadlines, (deadline, next(seq), fd, sock))
+                
+                if not in_flight:
+                    if exhausted:
+                        break
+                    # Out of descriptors with nothing of ours to wait on
+                    time.sleep(_EMFILE_BACKOFF)
+                    continue
+                
+                # Writable means the handshake finished; SO_ERROR says how
+                wait = max(0, deadlines[0][0] - time.monotonic())
+                for key, _ in sel.select(wait):
+                    sock, port, _ = in_flight[key.fd]
+                    result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    finish(key.fd)
+                    self._check_result(port, result)
+                
+                # Expire probes that never got an answer
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, fd, sock = heapq.heappop(deadlines)
+                    entry = in_flight.get(fd)
+                    if entry is not None and entry[0] is sock:
+                        finish(fd)
+        finally:
+            for sock, _, _ in in_flight.values():
+                sock.close()
+            sel.close()
+
+def _checksum(data):
+    """Internet checksum (RFC 1071) of a byte string"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+def _syn_segment(pseudo, src_port, dst_port, seq):
+    """Build a bare TCP SYN segment; the kernel supplies the IP header"""
+    header = struct.pack("!HHIIBBHHH", src_port, dst_port, seq, 0, 5 << 4, _TCP_SYN, 1024, 0, 0)
+    return header[:16] + struct.pack("!H", _checksum(pseudo + header)) + header[18:]
+
+class SynScanner(PortScanner):
+    """Half-open scanner that sends raw SYNs and waits for SYN+ACK (requires root)"""
+    
+    @staticmethod
+    def unavailable_reason():
+        """Return why raw TCP sockets can't be opened here, or None if they can"""
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP).close()
+        except (AttributeError, OSError) as e:
+            return str(e)
+        return None
+    
+    def _scan(self, ip, ports):
+        """SYN-scan the given ports"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        
+        # Bind a placeholder so the kernel never gives our source port to a real connection
+        with sock, socket.socket(socket.AF_INET, socket.SOCK_STREAM) as placeholder:
+            placeholder.bind(("", 0))
+            sock.setblocking(False)
+            self._syn_scan(sock, ip, ports, placeholder.getsockname()[1])
+    
+    def _syn_scan(self, sock, ip, ports, src_port):
+        # Let the routing table pick our source address
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.connect((ip, 9))
+            src_ip = probe.getsockname()[0]
+        dst_addr = socket.inet_aton(ip)
+        # The pseudo-header is identical for every probe, so build it once
+        pseudo = struct.pack("!4s4sBBH", socket.inet_aton(src_ip), dst_addr, 0, socket.IPPROTO_TCP, 20)
+        seqs = {}  # probed port -> sequence number of its SYN
+        seen = set()
+        
+        def drain(wait):
+            readable, _, _ = select.select([sock], [], [], wait)
+            if not readable:
+                return
+            while True:
+                try:
+                    packet = sock.recv(65535)
+                except BlockingIOError:
+                    return
+                ihl = (packet[0] & 0x0f) * 4
+                if packet[12:16] != dst_addr or len(packet) < ihl + 14:
+                    continue
+                sport, dport, _, ack = struct.unpack("!HHII", packet[ihl:ihl + 12])
+                flags = packet[ihl + 13]
+                if dport != src_port or flags & (_TCP_SYN | _TCP_ACK) != _TCP_SYN | _TCP_ACK:
+                    continue
+                # Only a SYN+ACK acknowledging one of our own SYNs counts
+                seq = seqs.get(sport)
+                if seq is not None and ack == (seq + 1) & 0xffffffff and sport not in seen:
+                    seen.add(sport)
+                    self._record_open(sport)
+        
+        for port in ports:
+            if self._stop.is_set():
+                break
+            seq = seqs[port] = random.getrandbits(32)
+            segment = _syn_segment(pseudo, src_port, port, seq)
+            while True:
+                try:
+                    sock.sendto(segment, (ip, 0))
+                    break
+                except (BlockingIOError, InterruptedError):
+                    drain(0.01)
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    drain(0.01)
+            drain(0)
+        
+        # Collect late replies until the timeout passes
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            drain(max(0, deadline - time.monotonic()))
+
+def positive_int(value):
+    """argparse type for integers greater than zero"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(
@@ -192,29 +703,70 @@ Examples:
     parser.add_argument('-t', '--target', required=True, help='Target hostname or IP address')
     parser.add_argument('-p', '--ports', help='Port range (e.g., 1-1000) or specific ports (e.g., 80,443,22)')
     parser.add_argument('-c', '--common', action='store_true', help='Scan only common ports')
-    parser.add_argument('--threads', type=int, default=100, help='Number of threads (default: 100)')
+    parser.add_argument('--threads', type=int, default=500, help='Maximum concurrent connections (default: 500)')
     parser.add_argument('--nmap', action='store_true', help='Compare results with Nmap')
-    parser.add_argument('--timeout', type=int, default=1, help='Socket timeout in seconds (default: 1)')
+    parser.add_argument('--engine', choices=['asyncio', 'selectors', 'threads'], default='asyncio',
+                        help='I/O engine used to drive the scan (default: asyncio)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Scan the common ports in the range first, then the rest')
+    parser.add_argument('--libc-probe', action='store_true',
+                        help='Thread engine: connect through libc via ctypes instead of the socket module (Linux)')
+    parser.add_argument('--first-n', type=positive_int, metavar='N',
+                        help='Stop scanning once N open ports have been found')
+    parser.add_argument('--syn', action='store_true',
+                        help='Half-open SYN scan using raw sockets (requires root, Linux)')
+    parser.add_argument('--timeout', type=float, default=1, help='Socket timeout in seconds (default: 1)')
     
     args = parser.parse_args()
     
     # Banner
-    print("="*60)
-    print("           SIMPLE PORT SCANNER")
-    print("      Python-based Network Port Scanner")
-    print("="*60)
-    print()
+    sys.stdout.write("="*60 + "\n"
+                     "           SIMPLE PORT SCANNER\n"
+                     "      Python-based Network Port Scanner\n"
+                     + "="*60 + "\n\n")
     
     # Initialize scanner
-    scanner = PortScanner(args.target, args.threads)
+    if args.engine == 'selectors':
+        scanner_class = SelectorScanner
+    elif args.engine == 'threads':
+        scanner_class = ThreadedScanner
+    else:
+        scanner_class = PortScanner
+    
+    # Without raw socket access, --syn falls back to the selected connect engine
+    if args.syn:
+        reason = SynScanner.unavailable_reason()
+        if reason is None:
+            scanner_class = SynScanner
+        else:
+            print(f"[WARN] SYN scan unavailable ({reason}), falling back to connect scan")
+    
+    if scanner_class is PortScanner:
+        # libuv-backed event loop, if available, for faster connect dispatch
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
+    
+    scanner = scanner_class(args.target, args.threads, args.timeout, args.first_n)
+    if args.libc_probe:
+        libc_probe = _libc_tcp_probe() if isinstance(scanner, ThreadedScanner) else None
+        if libc_probe is None:
+            print("[WARN] --libc-probe needs --engine threads on Linux, ignoring")
+        else:
+            scanner.probe = libc_probe
     
     # Resolve target
     ip = scanner.resolve_target()
     if not ip:
         sys.exit(1)
     
+    # Wall-clock time for the report, monotonic clock for the duration
     start_time = datetime.now()
+    t0 = time.monotonic()
     
+    ports = None
     try:
         if args.common:
             # Scan common ports only
@@ -226,45 +778,35 @@ Examples:
             if '-' in args.ports:
                 # Port range
                 start_port, end_port = map(int, args.ports.split('-'))
-                scanner.scan_range(ip, start_port, end_port)
-                scan_type = f"Port Range {start_port}-{end_port}"
+                if args.adaptive:
+                    scanner.scan_range_adaptive(ip, start_port, end_port)
+                    scan_type = f"Adaptive Port Range {start_port}-{end_port}"
+                else:
+                    scanner.scan_range(ip, start_port, end_port)
+                    scan_type = f"Port Range {start_port}-{end_port}"
             else:
                 # Specific ports
-                ports = [int(p.strip()) for p in args.ports.split(',')]
-                print(f"[INFO] Scanning specific ports: {ports}")
-                print("-" * 50)
-                
-                threads = []
-                for port in ports:
-                    thread = threading.Thread(target=scanner.scan_port, args=(ip, port))
-                    thread.daemon = True
-                    thread.start()
-                    threads.append(thread)
-                
-                for thread in threads:
-                    thread.join()
-                
+                ports = list(dict.fromkeys(int(p.strip()) for p in args.ports.split(',')))
+                scanner.scan_specific_ports(ip, ports)
                 scan_type = f"Specific Ports: {args.ports}"
         else:
             # Default: scan common ports
             scanner.scan_common_ports(ip)
             scan_type = "Common Ports (Default)"
         
-        end_time = datetime.now()
+        duration = time.monotonic() - t0
         
         # Generate report
-        scanner.generate_report(scan_type, start_time, end_time)
+        scanner.generate_report(scan_type, start_time, duration)
         
         # Nmap comparison if requested
         if args.nmap:
-            if args.ports and ',' in args.ports:
-                ports_to_check = [int(p.strip()) for p in args.ports.split(',')]
-                scanner.nmap_comparison(ip, ports_to_check)
-            else:
-                scanner.nmap_comparison(ip)
+            scanner.nmap_comparison(ip, ports)
     
     except KeyboardInterrupt:
         print("\n[INFO] Scan interrupted by user")
+        if scanner._open_set:
+            print(f"[INFO] Open ports found so far: {sorted(scanner._open_set)}")
         sys.exit(0)
     except Exception as e:
         print(f"[ERROR] An error occurred: {e}")